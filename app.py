@@ -1,26 +1,29 @@
 import os
 import json
+import uuid
+import hashlib
+from functools import wraps
 from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file
+from werkzeug.middleware.proxy_fix import ProxyFix
+from flask import Flask, Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify, send_file, session, make_response
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, case
+from sqlalchemy.exc import IntegrityError
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-import docx
 from config import Config
+from middleware import CompressionMiddleware
+from ratelimit import limiter, admission
 
-app = Flask(__name__)
-app.config.from_object(Config)
-
-# Initialize SQLAlchemy with app
 db = SQLAlchemy()
-db.init_app(app)
 
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'main.login'
 login_manager.login_message_category = 'info'
 
+bp = Blueprint('main', __name__)
+
 # Database Models
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -61,6 +64,15 @@ class ExamSubmission(db.Model):
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(20), default='submitted')
 
+class ExamDraft(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    assignment_id = db.Column(db.Integer, db.ForeignKey('assignment.id'))
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    answers = db.Column(db.Text, default='{}')
+    client_token = db.Column(db.String(64))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    __table_args__ = (db.UniqueConstraint('assignment_id', 'student_id'),)
+
 class LibraryResource(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -91,19 +103,81 @@ def create_upload_folders():
         ]
         for folder in folders:
             os.makedirs(folder, exist_ok=True)
-        print("Created upload folders")
     except Exception as e:
         print(f"Warning: Could not create folders: {e}")
 
+def etag_cached(version_func):
+    """Answer GET requests with 304 when the page version has not changed.
+
+    ``version_func`` returns a cheap fingerprint of everything the page shows
+    (e.g. the latest ``created_at`` in the course), so an unchanged page is
+    never rendered twice for the same user.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Pending flash messages are rendered into the page once only
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+            
+            version = (current_app.config['CACHE_VERSION'], current_user.get_id(), request.full_path,
+                       version_func(*args, **kwargs))
+            etag = hashlib.sha1(repr(version).encode()).hexdigest()
+            
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            
+            # Weak, so the validator matches the one the compression middleware sends
+            response.set_etag(etag, weak=True)
+            response.vary.add('Accept-Encoding')
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+def user_version():
+    return (current_user.username, current_user.full_name, current_user.email,
+            current_user.course, current_user.role)
+
+def assignments_version():
+    # The overdue count changes the page as due dates pass without any write
+    overdue = func.count(case((Assignment.due_date < datetime.utcnow(), 1)))
+    return db.session.query(func.max(Assignment.created_at), func.count(Assignment.id), overdue).filter_by(course=current_user.course).one()
+
+def resources_version():
+    # Views are shown in the library, and the module filter spans all courses
+    return db.session.query(func.max(LibraryResource.uploaded_at), func.count(LibraryResource.id), func.sum(LibraryResource.views)).one()
+
+def submissions_version():
+    return db.session.query(func.max(ExamSubmission.submitted_at), func.count(ExamSubmission.id)).filter_by(student_id=current_user.id).one()
+
+def dashboard_version():
+    return (user_version(), tuple(assignments_version()), tuple(resources_version()), tuple(submissions_version()))
+
+def progress_version():
+    return (user_version(), tuple(assignments_version()), tuple(submissions_version()))
+
+def library_version():
+    return (user_version(), tuple(resources_version()))
+
 # Routes
-@app.route('/')
+@bp.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+def login_username():
+    return 'username:' + (request.form.get('username') or '').strip().lower()
+
+@bp.route('/login', methods=['GET', 'POST'])
+@limiter.limit('login', methods=['POST'], key=login_username)
+@limiter.limit('login_ip', methods=['POST'])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     
     if request.method == 'POST':
         username = request.form.get('username')
@@ -115,15 +189,15 @@ def login():
             login_user(user, remember=remember)
             flash('Login successful!', 'success')
             next_page = request.args.get('next')
-            return redirect(next_page or url_for('dashboard'))
+            return redirect(next_page or url_for('main.dashboard'))
         flash('Invalid username or password', 'danger')
     
     return render_template('login.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     
     if request.method == 'POST':
         username = request.form.get('username')
@@ -135,15 +209,15 @@ def register():
         
         if password != confirm_password:
             flash('Passwords do not match', 'danger')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
         
         if User.query.filter_by(username=username).first():
             flash('Username already exists', 'danger')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
         
         if User.query.filter_by(email=email).first():
             flash('Email already registered', 'danger')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
         
         user = User(
             username=username,
@@ -158,12 +232,13 @@ def register():
         db.session.commit()
         
         flash('Registration successful! Please login.', 'success')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     return render_template('register.html')
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
 @login_required
+@etag_cached(dashboard_version)
 def dashboard():
     assignments = Assignment.query.filter_by(course=current_user.course).order_by(Assignment.created_at.desc()).limit(5).all()
     resources = LibraryResource.query.filter_by(course=current_user.course).order_by(LibraryResource.uploaded_at.desc()).limit(5).all()
@@ -176,12 +251,12 @@ def dashboard():
                          submissions=submissions,
                          user=current_user)
 
-@app.route('/upload_assignment', methods=['GET', 'POST'])
+@bp.route('/upload_assignment', methods=['GET', 'POST'])
 @login_required
 def upload_assignment():
     if current_user.role not in ['instructor', 'admin']:
         flash('You do not have permission to upload assignments', 'danger')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     
     if request.method == 'POST':
         title = request.form.get('title')
@@ -193,7 +268,7 @@ def upload_assignment():
         
         if not title:
             flash('Title is required', 'danger')
-            return redirect(url_for('upload_assignment'))
+            return redirect(url_for('main.upload_assignment'))
         
         assignment = Assignment(
             title=title,
@@ -209,11 +284,11 @@ def upload_assignment():
                 assignment.due_date = datetime.strptime(due_date, '%Y-%m-%d')
             except ValueError:
                 flash('Invalid date format. Use YYYY-MM-DD', 'danger')
-                return redirect(url_for('upload_assignment'))
+                return redirect(url_for('main.upload_assignment'))
         
         if file and allowed_file(file.filename):
             filename = secure_filename(f"{datetime.now().timestamp()}_{file.filename}")
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], Config.ASSIGNMENTS_FOLDER, filename)
+            filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], Config.ASSIGNMENTS_FOLDER, filename)
             file.save(filepath)
             assignment.filename = filename
             assignment.file_type = filename.rsplit('.', 1)[1].lower()
@@ -229,18 +304,21 @@ def upload_assignment():
                         assignment.questions = json.dumps(questions)
                 except json.JSONDecodeError:
                     flash('Invalid JSON file format', 'danger')
-                    return redirect(url_for('upload_assignment'))
+                    return redirect(url_for('main.upload_assignment'))
         
         db.session.add(assignment)
         db.session.commit()
         flash('Assignment uploaded successfully!', 'success')
-        return redirect(url_for('assignments'))
+        return redirect(url_for('main.assignments'))
     
     recent_assignments = Assignment.query.filter_by(created_by=current_user.id).order_by(Assignment.created_at.desc()).limit(3).all()
     
     return render_template('upload_assignment.html', recent_assignments=recent_assignments)
 
 def parse_docx_questions(filepath):
+    # python-docx is slow to import and only needed when parsing uploads
+    import docx
+    
     try:
         doc = docx.Document(filepath)
         questions = []
@@ -278,8 +356,9 @@ def parse_docx_questions(filepath):
         print(f"Error parsing DOCX: {e}")
         return []
 
-@app.route('/assignments')
+@bp.route('/assignments')
 @login_required
+@etag_cached(progress_version)
 def assignments():
     assignments_list = Assignment.query.filter_by(course=current_user.course).order_by(Assignment.created_at.desc()).all()
     
@@ -290,14 +369,16 @@ def assignments():
                          assignments=assignments_list,
                          submissions=submission_dict)
 
-@app.route('/take_exam/<int:assignment_id>', methods=['GET', 'POST'])
+@bp.route('/take_exam/<int:assignment_id>', methods=['GET', 'POST'])
 @login_required
+@limiter.limit('exam_submit', methods=['POST'])
+@admission.priority('high')
 def take_exam(assignment_id):
     assignment = Assignment.query.get_or_404(assignment_id)
     
     if assignment.course != current_user.course:
         flash('This assignment is not available for your course', 'danger')
-        return redirect(url_for('assignments'))
+        return redirect(url_for('main.assignments'))
     
     existing_submission = ExamSubmission.query.filter_by(
         assignment_id=assignment_id,
@@ -306,29 +387,22 @@ def take_exam(assignment_id):
     
     if existing_submission:
         flash('You have already submitted this exam', 'warning')
-        return redirect(url_for('assignments'))
+        return redirect(url_for('main.assignments'))
     
     if request.method == 'POST':
-        answers = request.form.to_dict()
+        if not valid_exam_answers(assignment, request.form.to_dict()):
+            flash('Your answers could not be read, please try again', 'danger')
+            return redirect(url_for('main.take_exam', assignment_id=assignment_id))
         
-        questions = json.loads(assignment.questions) if assignment.questions else []
-        score = 0
-        total_points = 0
+        draft = get_or_create_draft(assignment_id)
+        if not claim_draft(draft, 'form:' + uuid.uuid4().hex):
+            flash('You have already submitted this exam', 'warning')
+            return redirect(url_for('main.assignments'))
         
-        if questions:
-            for i, q in enumerate(questions):
-                points = q.get('points', 1)
-                total_points += points
-                user_answer = answers.get(f'question_{i}')
-                
-                if user_answer and user_answer == q.get('correct_answer'):
-                    score += points
-            
-            final_score = (score / total_points * assignment.max_score) if total_points > 0 else 0
-            status = 'graded'
-        else:
-            final_score = None
-            status = 'submitted'
+        # Answers autosaved from this or another device count too
+        answers = json.loads(draft.answers or '{}')
+        answers.update(request.form.to_dict())
+        final_score, status = grade_exam(assignment, answers)
         
         submission = ExamSubmission(
             assignment_id=assignment_id,
@@ -340,21 +414,187 @@ def take_exam(assignment_id):
         
         db.session.add(submission)
         db.session.commit()
+        flash_exam_result(final_score)
         
-        if final_score is not None:
-            flash(f'Exam submitted! Your score: {final_score:.1f}%', 'success')
-        else:
-            flash('Exam submitted successfully! It will be graded manually.', 'success')
-        
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     
     questions = json.loads(assignment.questions) if assignment.questions else []
     return render_template('take_exam.html', 
                          assignment=assignment, 
                          questions=questions)
 
-@app.route('/library')
+def grade_exam(assignment, answers):
+    """Score answers against the assignment questions, returning (score, status)."""
+    questions = json.loads(assignment.questions) if assignment.questions else []
+    if not questions:
+        return None, 'submitted'
+    
+    score = 0
+    total_points = 0
+    for i, q in enumerate(questions):
+        points = q.get('points', 1)
+        total_points += points
+        user_answer = answers.get(f'question_{i}')
+        
+        if user_answer and user_answer == q.get('correct_answer'):
+            score += points
+    
+    final_score = (score / total_points * assignment.max_score) if total_points > 0 else 0
+    return final_score, 'graded'
+
+def flash_exam_result(final_score):
+    if final_score is not None:
+        flash(f'Exam submitted! Your score: {final_score:.1f}%', 'success')
+    else:
+        flash('Exam submitted successfully! It will be graded manually.', 'success')
+
+def valid_exam_answers(assignment, answers):
+    """Check that ``answers`` only holds text answers to this assignment's questions."""
+    questions = json.loads(assignment.questions) if assignment.questions else []
+    names = {f'question_{i}' for i in range(len(questions))}
+    max_length = current_app.config['EXAM_ANSWER_MAX_LENGTH']
+    return all(name in names and isinstance(answer, str) and len(answer) <= max_length
+               for name, answer in answers.items())
+
+def get_or_create_draft(assignment_id):
+    draft = ExamDraft.query.filter_by(assignment_id=assignment_id, student_id=current_user.id).first()
+    if draft is None:
+        db.session.add(ExamDraft(assignment_id=assignment_id, student_id=current_user.id, answers='{}'))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Created by a concurrent request; the unique key keeps one row
+            db.session.rollback()
+        draft = ExamDraft.query.filter_by(assignment_id=assignment_id, student_id=current_user.id).one()
+    return draft
+
+def claim_draft(draft, token):
+    """Atomically mark the draft as submitted with ``token``.
+
+    Every submit path claims the student's single draft row before creating
+    an ExamSubmission, so concurrent submits can create at most one. Returns
+    False when another submit got there first.
+    """
+    claimed = ExamDraft.query.filter_by(id=draft.id, client_token=None).update(
+        {'client_token': token}, synchronize_session=False)
+    if not claimed:
+        db.session.rollback()
+        db.session.refresh(draft)
+        return False
+    draft.client_token = token
+    return True
+
+def exam_version(assignment_id):
+    # Questions are fixed once an assignment is uploaded
+    return db.session.query(Assignment.created_at).filter_by(id=assignment_id).scalar()
+
+@bp.route('/exam/<int:assignment_id>/questions')
 @login_required
+@etag_cached(exam_version)
+def exam_questions(assignment_id):
+    assignment = Assignment.query.get_or_404(assignment_id)
+    
+    if assignment.course != current_user.course:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    questions = json.loads(assignment.questions) if assignment.questions else []
+    
+    # Correct answers never leave the server
+    return jsonify({
+        'id': assignment.id,
+        'questions': [{
+            'question': q.get('question'),
+            'question_type': q.get('question_type'),
+            'options': q.get('options', [])
+        } for q in questions]
+    })
+
+@bp.route('/exam/<int:assignment_id>/autosave', methods=['GET', 'POST'])
+@login_required
+@limiter.limit('exam_autosave', methods=['POST'])
+@admission.priority('high')
+def exam_autosave(assignment_id):
+    assignment = Assignment.query.get_or_404(assignment_id)
+    
+    if assignment.course != current_user.course:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    draft = ExamDraft.query.filter_by(assignment_id=assignment_id, student_id=current_user.id).first()
+    
+    if request.method == 'GET':
+        return jsonify({'answers': json.loads(draft.answers) if draft else {}})
+    
+    data = request.get_json(silent=True)
+    changes = data.get('answers') if isinstance(data, dict) else None
+    if not isinstance(changes, dict) or not valid_exam_answers(assignment, changes):
+        return jsonify({'error': 'Invalid answers'}), 400
+    
+    if (draft and draft.client_token) or ExamSubmission.query.filter_by(
+            assignment_id=assignment_id, student_id=current_user.id).first():
+        return jsonify({'error': 'You have already submitted this exam'}), 409
+    
+    if draft is None:
+        draft = get_or_create_draft(assignment_id)
+    
+    # Only the answers changed since the last sync are sent
+    answers = json.loads(draft.answers or '{}')
+    answers.update(changes)
+    draft.answers = json.dumps(answers)
+    db.session.commit()
+    
+    return jsonify({'success': True, 'saved': len(changes)})
+
+@bp.route('/exam/<int:assignment_id>/submit', methods=['POST'])
+@login_required
+@limiter.limit('exam_submit')
+@admission.priority('high')
+def submit_exam(assignment_id):
+    assignment = Assignment.query.get_or_404(assignment_id)
+    
+    if assignment.course != current_user.course:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Invalid submission'}), 400
+    token = data.get('token')
+    changes = data.get('answers', {})
+    if (not isinstance(token, str) or not 0 < len(token) <= 64
+            or not isinstance(changes, dict) or not valid_exam_answers(assignment, changes)):
+        return jsonify({'error': 'Invalid submission'}), 400
+    
+    submission = ExamSubmission.query.filter_by(assignment_id=assignment_id, student_id=current_user.id).first()
+    draft = get_or_create_draft(assignment_id)
+    
+    if submission is None and claim_draft(draft, token):
+        answers = json.loads(draft.answers or '{}')
+        answers.update(changes)
+        draft.answers = json.dumps(answers)
+    else:
+        submission = ExamSubmission.query.filter_by(assignment_id=assignment_id, student_id=current_user.id).first()
+        # A retry of a submit whose response was lost gets the same result
+        if submission and draft.client_token == token:
+            flash_exam_result(submission.score)
+            return jsonify({'success': True, 'score': submission.score, 'redirect': url_for('main.dashboard')})
+        return jsonify({'error': 'You have already submitted this exam'}), 409
+    
+    final_score, status = grade_exam(assignment, answers)
+    submission = ExamSubmission(
+        assignment_id=assignment_id,
+        student_id=current_user.id,
+        answers=json.dumps(answers),
+        score=final_score,
+        status=status
+    )
+    db.session.add(submission)
+    db.session.commit()
+    
+    flash_exam_result(final_score)
+    return jsonify({'success': True, 'score': final_score, 'redirect': url_for('main.dashboard')})
+
+@bp.route('/library')
+@login_required
+@etag_cached(library_version)
 def library():
     resource_type = request.args.get('type', 'all')
     module = request.args.get('module', 'all')
@@ -376,12 +616,12 @@ def library():
                          current_type=resource_type,
                          current_module=module)
 
-@app.route('/upload_resource', methods=['GET', 'POST'])
+@bp.route('/upload_resource', methods=['GET', 'POST'])
 @login_required
 def upload_resource():
     if current_user.role not in ['instructor', 'admin']:
         flash('You do not have permission to upload resources', 'danger')
-        return redirect(url_for('library'))
+        return redirect(url_for('main.library'))
     
     if request.method == 'POST':
         title = request.form.get('title')
@@ -392,11 +632,11 @@ def upload_resource():
         
         if not title or not file:
             flash('Title and file are required', 'danger')
-            return redirect(url_for('upload_resource'))
+            return redirect(url_for('main.upload_resource'))
         
         if allowed_file(file.filename):
             filename = secure_filename(f"{datetime.now().timestamp()}_{file.filename}")
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], Config.LIBRARY_FOLDER, filename)
+            filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], Config.LIBRARY_FOLDER, filename)
             file.save(filepath)
             
             resource = LibraryResource(
@@ -412,39 +652,41 @@ def upload_resource():
             db.session.add(resource)
             db.session.commit()
             flash('Resource uploaded successfully!', 'success')
-            return redirect(url_for('library'))
+            return redirect(url_for('main.library'))
         else:
             flash('File type not allowed', 'danger')
-            return redirect(url_for('upload_resource'))
+            return redirect(url_for('main.upload_resource'))
     
     recent_resources = LibraryResource.query.filter_by(uploaded_by=current_user.id).order_by(LibraryResource.uploaded_at.desc()).limit(3).all()
     
     return render_template('upload_resource.html', recent_resources=recent_resources)
 
-@app.route('/download/<resource_type>/<filename>')
+@bp.route('/download/<resource_type>/<filename>')
 @login_required
+@limiter.limit('download')
+@admission.priority('low')
 def download_file(resource_type, filename):
     if resource_type == 'assignment':
         folder = Config.ASSIGNMENTS_FOLDER
         assignment = Assignment.query.filter_by(filename=filename).first()
         if assignment and assignment.course != current_user.course:
             flash('You do not have access to this file', 'danger')
-            return redirect(url_for('assignments'))
+            return redirect(url_for('main.assignments'))
     elif resource_type == 'library':
         folder = Config.LIBRARY_FOLDER
         resource = LibraryResource.query.filter_by(filename=filename).first()
         if resource and resource.course != current_user.course:
             flash('You do not have access to this file', 'danger')
-            return redirect(url_for('library'))
+            return redirect(url_for('main.library'))
     else:
         flash('Invalid resource type', 'danger')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], folder, filename)
+    filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], folder, filename)
     
     if not os.path.exists(filepath):
         flash('File not found', 'danger')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     
     if resource_type == 'library':
         resource = LibraryResource.query.filter_by(filename=filename).first()
@@ -454,12 +696,12 @@ def download_file(resource_type, filename):
     
     return send_file(filepath, as_attachment=True)
 
-@app.route('/admin_dashboard')
+@bp.route('/admin_dashboard')
 @login_required
 def admin_dashboard():
     if current_user.role != 'admin':
         flash('Access denied', 'danger')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     
     users = User.query.all()
     assignments = Assignment.query.all()
@@ -481,7 +723,7 @@ def admin_dashboard():
                          total_resources=total_resources,
                          total_submissions=total_submissions)
 
-@app.route('/admin/delete_user/<int:user_id>', methods=['DELETE'])
+@bp.route('/admin/delete_user/<int:user_id>', methods=['DELETE'])
 @login_required
 def delete_user(user_id):
     if current_user.role != 'admin':
@@ -497,7 +739,7 @@ def delete_user(user_id):
     
     return jsonify({'success': True})
 
-@app.route('/admin/delete_assignment/<int:assignment_id>', methods=['DELETE'])
+@bp.route('/admin/delete_assignment/<int:assignment_id>', methods=['DELETE'])
 @login_required
 def delete_assignment(assignment_id):
     if current_user.role != 'admin':
@@ -506,7 +748,7 @@ def delete_assignment(assignment_id):
     assignment = Assignment.query.get_or_404(assignment_id)
     
     if assignment.filename:
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], Config.ASSIGNMENTS_FOLDER, assignment.filename)
+        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], Config.ASSIGNMENTS_FOLDER, assignment.filename)
         if os.path.exists(filepath):
             try:
                 os.remove(filepath)
@@ -518,7 +760,7 @@ def delete_assignment(assignment_id):
     
     return jsonify({'success': True})
 
-@app.route('/admin/delete_resource/<int:resource_id>', methods=['DELETE'])
+@bp.route('/admin/delete_resource/<int:resource_id>', methods=['DELETE'])
 @login_required
 def delete_resource(resource_id):
     if current_user.role != 'admin':
@@ -527,7 +769,7 @@ def delete_resource(resource_id):
     resource = LibraryResource.query.get_or_404(resource_id)
     
     if resource.filename:
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], Config.LIBRARY_FOLDER, resource.filename)
+        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], Config.LIBRARY_FOLDER, resource.filename)
         if os.path.exists(filepath):
             try:
                 os.remove(filepath)
@@ -539,12 +781,12 @@ def delete_resource(resource_id):
     
     return jsonify({'success': True})
 
-@app.route('/admin/update_user/<int:user_id>', methods=['POST'])
+@bp.route('/admin/update_user/<int:user_id>', methods=['POST'])
 @login_required
 def update_user(user_id):
     if current_user.role != 'admin':
         flash('Unauthorized', 'danger')
-        return redirect(url_for('admin_dashboard'))
+        return redirect(url_for('main.admin_dashboard'))
     
     user = User.query.get_or_404(user_id)
     user.role = request.form.get('role', user.role)
@@ -558,9 +800,9 @@ def update_user(user_id):
     
     db.session.commit()
     flash('User updated successfully', 'success')
-    return redirect(url_for('admin_dashboard'))
+    return redirect(url_for('main.admin_dashboard'))
 
-@app.route('/update_profile', methods=['POST'])
+@bp.route('/update_profile', methods=['POST'])
 @login_required
 def update_profile():
     current_user.full_name = request.form.get('full_name')
@@ -570,7 +812,7 @@ def update_profile():
     current_password = request.form.get('current_password')
     if current_password and not current_user.check_password(current_password):
         flash('Current password is incorrect', 'danger')
-        return redirect(url_for('profile'))
+        return redirect(url_for('main.profile'))
     
     new_password = request.form.get('new_password')
     if new_password and len(new_password) >= 6:
@@ -578,14 +820,14 @@ def update_profile():
     
     db.session.commit()
     flash('Profile updated successfully', 'success')
-    return redirect(url_for('profile'))
+    return redirect(url_for('main.profile'))
 
-@app.route('/admin/add_user', methods=['POST'])
+@bp.route('/admin/add_user', methods=['POST'])
 @login_required
 def add_user():
     if current_user.role != 'admin':
         flash('Unauthorized', 'danger')
-        return redirect(url_for('admin_dashboard'))
+        return redirect(url_for('main.admin_dashboard'))
     
     username = request.form.get('username')
     email = request.form.get('email')
@@ -596,11 +838,11 @@ def add_user():
     
     if User.query.filter_by(username=username).first():
         flash('Username already exists', 'danger')
-        return redirect(url_for('admin_dashboard'))
+        return redirect(url_for('main.admin_dashboard'))
     
     if User.query.filter_by(email=email).first():
         flash('Email already registered', 'danger')
-        return redirect(url_for('admin_dashboard'))
+        return redirect(url_for('main.admin_dashboard'))
     
     user = User(
         username=username,
@@ -614,10 +856,11 @@ def add_user():
     db.session.add(user)
     db.session.commit()
     flash('User created successfully', 'success')
-    return redirect(url_for('admin_dashboard'))
+    return redirect(url_for('main.admin_dashboard'))
 
-@app.route('/profile')
+@bp.route('/profile')
 @login_required
+@etag_cached(progress_version)
 def profile():
     submissions = ExamSubmission.query.filter_by(student_id=current_user.id).order_by(ExamSubmission.submitted_at.desc()).all()
     
@@ -628,14 +871,14 @@ def profile():
                          submissions=submissions,
                          assignments=assignments)
 
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
     logout_user()
     flash('You have been logged out', 'info')
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/admin/clear_cache', methods=['POST'])
+@bp.route('/admin/clear_cache', methods=['POST'])
 @login_required
 def clear_cache():
     if current_user.role != 'admin':
@@ -657,34 +900,39 @@ CNA_MODULES = [
     'Medical Terminology'
 ]
 
-@app.context_processor
+@bp.app_context_processor
 def inject_modules():
     return dict(cna_modules=CNA_MODULES)
 
-@app.context_processor
+@bp.app_context_processor
 def inject_datetime():
     return dict(datetime=datetime)
 
 # Error handlers
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def page_not_found(e):
     return render_template('404.html'), 404
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def internal_server_error(e):
     return render_template('500.html'), 500
 
-@app.errorhandler(403)
+@bp.app_errorhandler(403)
 def forbidden(e):
     return render_template('403.html'), 403
 
-# Initialize database and create upload folders
-def initialize_database():
+@bp.app_errorhandler(429)
+def too_many_requests(e):
+    return render_template('429.html'), 429, [h for h in e.get_headers() if h[0] == 'Retry-After']
+
+@bp.app_errorhandler(503)
+def service_unavailable(e):
+    return render_template('503.html'), 503, [h for h in e.get_headers() if h[0] == 'Retry-After']
+
+# Initialize database tables and default users
+def initialize_database(app):
     with app.app_context():
         try:
-            # Create upload folders first
-            create_upload_folders()
-            
             # Create tables
             db.create_all()
             print("Database tables created")
@@ -719,17 +967,51 @@ def initialize_database():
             print("Database initialized successfully")
             
         except Exception as e:
+            db.session.rollback()
             print(f"Error initializing database: {e}")
-            # Don't crash if database initialization fails
-            # The app will still run and try to reconnect
+            raise
+
+def create_app(config_class=Config):
+    """Build the application without touching the database.
+
+    One-time setup (tables, default users) lives in the
+    ``flask --app app init-db`` command so worker boots stay cheap.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    
+    # Every instance needs these on its own disk; a release phase runs elsewhere
+    create_upload_folders()
+    if app.config['PROXY_COUNT']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_COUNT'], x_proto=app.config['PROXY_COUNT'])
+    app.wsgi_app = CompressionMiddleware(app.wsgi_app,
+                                         min_size=app.config['COMPRESS_MIN_SIZE'],
+                                         level=app.config['COMPRESS_LEVEL'],
+                                         mimetypes=app.config['COMPRESS_MIMETYPES'])
+    
+    db.init_app(app)
+    login_manager.init_app(app)
+    limiter.init_app(app)
+    admission.init_app(app)
+    app.register_blueprint(bp)
+    
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create tables and the default users."""
+        try:
+            initialize_database(app)
+        except Exception:
+            # A non-zero exit stops the release phase / start command
+            raise SystemExit(1)
+    
+    return app
 
-# Run initialization
-try:
-    initialize_database()
-except Exception as e:
-    print(f"Warning: Database initialization failed: {e}")
-    print("App will continue running...")
+app = create_app()
 
 if __name__ == '__main__':
+    try:
+        initialize_database(app)
+    except Exception:
+        print("App will continue running...")
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
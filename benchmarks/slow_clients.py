@@ -0,0 +1,140 @@
+"""Load test: throughput of normal requests while many slow clients are connected.
+
+Start the server the way production does, e.g.
+
+    GUNICORN_WORKER_CLASS=sync   gunicorn -c gunicorn.conf.py app:app
+    GUNICORN_WORKER_CLASS=gevent gunicorn -c gunicorn.conf.py app:app
+
+then run
+
+    python benchmarks/slow_clients.py --url http://127.0.0.1:5000 --slow 50 --create-slow-file 8
+
+Slow clients request ``--slow-path`` and read the response a few bytes at a
+time, the way a student on a bad mobile connection downloads a video. The
+file must be several MB, larger than the kernel socket buffers, or a sync
+worker hands it off at once and is not actually held up; ``--create-slow-file``
+writes one of that size into ``static/uploads`` and removes it afterwards. At the
+same time ``--fast`` clients hammer ``--fast-path`` and the script reports how
+many of those requests completed and their latency. With sync workers the
+fast clients starve; with gevent workers throughput should stay flat.
+"""
+import argparse
+import os
+import socket
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SLOW_FILE = 'static/uploads/loadtest.bin'
+
+
+def slow_client(host, port, path, cookie, stop, read_size, delay):
+    while not stop.is_set():
+        try:
+            sock = socket.create_connection((host, port), timeout=30)
+        except OSError:
+            time.sleep(delay)
+            continue
+        try:
+            request = f'GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n'
+            if cookie:
+                request += f'Cookie: {cookie}\r\n'
+            sock.sendall((request + '\r\n').encode())
+            while not stop.is_set():
+                if not sock.recv(read_size):
+                    break
+                time.sleep(delay)
+        except OSError:
+            pass
+        finally:
+            sock.close()
+
+
+def fast_client(url, cookie, stop, latencies, errors, lock):
+    headers = {'Cookie': cookie} if cookie else {}
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=30) as response:
+                response.read()
+        except (urllib.error.URLError, OSError):
+            with lock:
+                errors.append(1)
+            continue
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+
+def run(args):
+    parts = urlsplit(args.url)
+    host, port = parts.hostname, parts.port or 80
+    stop = threading.Event()
+    latencies, errors, lock = [], [], threading.Lock()
+
+    threads = [threading.Thread(target=slow_client, daemon=True,
+                                args=(host, port, args.slow_path, args.cookie, stop, args.read_size, args.delay))
+               for _ in range(args.slow)]
+    for thread in threads:
+        thread.start()
+    # Let the slow clients occupy their connections first
+    time.sleep(min(2.0, args.duration / 4))
+
+    fast_threads = [threading.Thread(target=fast_client, daemon=True,
+                                     args=(args.url.rstrip('/') + args.fast_path, args.cookie, stop, latencies, errors, lock))
+                    for _ in range(args.fast)]
+    started = time.perf_counter()
+    for thread in fast_threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    elapsed = time.perf_counter() - started
+
+    with lock:
+        return list(latencies), list(errors), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--slow', type=int, default=50, help='number of slow clients')
+    parser.add_argument('--fast', type=int, default=10, help='number of normal clients')
+    parser.add_argument('--slow-path', default='/' + SLOW_FILE)
+    parser.add_argument('--create-slow-file', type=int, metavar='MB',
+                        help=f'write a file of this size to {SLOW_FILE} before starting')
+    parser.add_argument('--fast-path', default='/login')
+    parser.add_argument('--read-size', type=int, default=64, help='bytes read per tick by slow clients')
+    parser.add_argument('--delay', type=float, default=0.5, help='seconds between slow reads')
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--cookie', default='', help='session cookie for login-protected paths')
+    args = parser.parse_args()
+
+    slow_file = None
+    if args.create_slow_file:
+        slow_file = os.path.join(ROOT, SLOW_FILE)
+        os.makedirs(os.path.dirname(slow_file), exist_ok=True)
+        with open(slow_file, 'wb') as f:
+            f.write(os.urandom(args.create_slow_file * 1024 * 1024))
+
+    try:
+        latencies, errors, elapsed = run(args)
+    finally:
+        if slow_file:
+            os.remove(slow_file)
+
+    done = sorted(latencies)
+    print(f'slow clients:     {args.slow}')
+    print(f'fast clients:     {args.fast}')
+    print(f'completed:        {len(done)} requests in {elapsed:.1f}s ({len(done) / elapsed:.1f} req/s)')
+    print(f'errors:           {len(errors)}')
+    if done:
+        print(f'latency p50:      {statistics.median(done) * 1000:.0f} ms')
+        print(f'latency p95:      {done[min(len(done) - 1, int(len(done) * 0.95))] * 1000:.0f} ms')
+        print(f'latency max:      {done[-1] * 1000:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
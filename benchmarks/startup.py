@@ -0,0 +1,52 @@
+"""Startup benchmark: how long a fresh worker takes to import the app.
+
+    python benchmarks/startup.py --runs 10
+
+Each run starts a new interpreter (like a gunicorn worker or an autoscaled
+instance would), imports ``app`` and builds one more app with
+``create_app()``. Reports median and worst times and checks that no heavy
+optional module was imported as a side effect.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+built = time.perf_counter()
+print(json.dumps({
+    'import': imported - start,
+    'create_app': built - imported,
+    'docx_loaded': 'docx' in sys.modules,
+}))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    results = []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    for key in ('import', 'create_app'):
+        times = [r[key] * 1000 for r in results]
+        print(f'{key:<12} median {statistics.median(times):7.1f} ms   max {max(times):7.1f} ms')
+    print(f'docx loaded at startup: {any(r["docx_loaded"] for r in results)}')
+
+
+if __name__ == '__main__':
+    main()
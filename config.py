@@ -11,6 +11,17 @@ class Config:
         if DATABASE_URL.startswith('postgres://'):
             DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
         SQLALCHEMY_DATABASE_URI = DATABASE_URL
+        
+        # Every worker keeps its own pool, so workers * (pool_size + max_overflow)
+        # must stay under the database connection limit. Greenlets beyond the
+        # pool wait up to pool_timeout seconds for a connection.
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+            'pool_pre_ping': True,
+        }
     else:
         # For local development, use SQLite in instance folder
         SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'database.db')
@@ -30,3 +41,38 @@ class Config:
     
     # Session settings
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
+    
+    # Longest answer accepted for one exam question
+    EXAM_ANSWER_MAX_LENGTH = int(os.environ.get('EXAM_ANSWER_MAX_LENGTH', 5000))
+    
+    # Response compression settings
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_MIMETYPES = {'text/html', 'text/css', 'text/plain', 'text/javascript',
+                          'application/javascript', 'application/json', 'application/xml'}
+    
+    # Rate limiting: name -> (tokens per second, burst), keyed per user or IP.
+    # Logins are keyed on the submitted username; the per-IP cap is loose
+    # because a whole classroom can share one NAT address.
+    # 'sqlite' shares the buckets between all workers on the host.
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE', 'memory')
+    RATE_LIMIT_SQLITE_PATH = os.environ.get('RATE_LIMIT_SQLITE_PATH') or os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'ratelimit.db')
+    RATE_LIMITS = {
+        'login': (0.1, 5),
+        'login_ip': (5, 100),
+        'exam_submit': (0.2, 3),
+        'exam_autosave': (1, 10),
+        'download': (1, 20),
+    }
+    
+    # Admission control: requests in flight per worker before shedding load
+    ADMISSION_MAX_IN_FLIGHT = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', 50))
+    ADMISSION_LOW_PRIORITY_SHARE = float(os.environ.get('ADMISSION_LOW_PRIORITY_SHARE', 0.5))
+    ADMISSION_RETRY_AFTER = 5
+    
+    # Number of reverse proxies in front of the app, used to find the client IP
+    PROXY_COUNT = int(os.environ.get('PROXY_COUNT', 0))
+    
+    # Bumped on every deploy so cached pages are revalidated against new templates
+    CACHE_VERSION = os.environ.get('CACHE_VERSION') or os.environ.get('RENDER_GIT_COMMIT', '')
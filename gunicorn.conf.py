@@ -0,0 +1,50 @@
+import os
+
+# Gunicorn settings, tunable from the environment.
+#
+# The default gevent worker serves each request on a greenlet, so a student
+# slowly downloading a video or uploading a file no longer blocks a whole
+# worker process. Set GUNICORN_WORKER_CLASS=gthread (with GUNICORN_THREADS)
+# or sync to fall back to the stock workers.
+
+bind = '0.0.0.0:' + os.environ.get('PORT', '5000')
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+
+# Pool sizing: worker_connections only bounds open sockets per worker. A
+# request holds a DB connection just while its view runs (the session is
+# removed at teardown, before the body is streamed), so most of those
+# sockets are slow clients reading a response and need no connection.
+# DB_POOL_SIZE + DB_MAX_OVERFLOW (10 by default) caps concurrent queries per
+# worker; extra greenlets queue for up to DB_POOL_TIMEOUT seconds.
+# ADMISSION_MAX_IN_FLIGHT (50) keeps requests in flight below this limit,
+# and workers * 10 stays well under the PostgreSQL connection limit.
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers now and then so a leak can't take the site down mid-exam
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# The app must be imported after gevent has monkey-patched the worker,
+# otherwise sockets and the DB driver stay blocking.
+preload_app = False
+
+accesslog = '-'
+
+
+def post_fork(server, worker):
+    # Make psycopg2 yield to other greenlets while waiting on PostgreSQL.
+    # Check the worker actually running, which `-k` on the command line can override.
+    if type(worker).__module__ == 'gunicorn.workers.ggevent':
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            server.log.warning('psycogreen not installed; PostgreSQL queries will block the worker')
+        else:
+            patch_psycopg()
@@ -0,0 +1,111 @@
+import zlib
+
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class CompressionMiddleware:
+    """WSGI middleware that gzip/brotli-compresses text responses.
+
+    Responses smaller than ``min_size`` are passed through untouched. Responses
+    without a Content-Length (streamed) are compressed chunk by chunk so the
+    client still receives data progressively.
+    """
+
+    def __init__(self, app, min_size=500, level=6, mimetypes=None):
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+        self.mimetypes = set(mimetypes or ())
+
+    def __call__(self, environ, start_response):
+        encoding = self._choose_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.app(environ, start_response)
+
+        state = {}
+
+        def _start_response(status, headers, exc_info=None):
+            if self._should_compress(status, headers):
+                state['streamed'] = not any(k.lower() == 'content-length' for k, _ in headers)
+                headers = [(k, v) for k, v in headers if k.lower() not in ('content-length', 'accept-ranges')]
+                headers = [(k, self._weaken_etag(v) if k.lower() == 'etag' else v) for k, v in headers]
+                headers.append(('Content-Encoding', encoding))
+                headers.append(('Vary', 'Accept-Encoding'))
+                state['compress'] = True
+            return start_response(status, headers, exc_info)
+
+        app_iter = self.app(environ, _start_response)
+        if not state.get('compress'):
+            return app_iter
+        # A generator's finally never runs if it is closed before the first
+        # next(), so the wrapped iterable is closed explicitly instead
+        return ClosingIterator(self._compress(app_iter, encoding, state['streamed']),
+                               getattr(app_iter, 'close', None))
+
+    def _choose_encoding(self, accept_encoding):
+        accepted = {}
+        for part in accept_encoding.split(','):
+            name, _, params = part.strip().partition(';')
+            quality = 1.0
+            params = params.strip()
+            if params.startswith('q='):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            if name:
+                accepted[name.lower()] = quality
+
+        if brotli is not None and accepted.get('br', 0) > 0:
+            return 'br'
+        if accepted.get('gzip', 0) > 0:
+            return 'gzip'
+        return None
+
+    def _should_compress(self, status, headers):
+        if int(status.split(' ', 1)[0]) in (204, 206, 304):
+            return False
+
+        header_map = {k.lower(): v for k, v in headers}
+        if 'content-encoding' in header_map:
+            return False
+        if 'no-transform' in header_map.get('cache-control', ''):
+            return False
+
+        mimetype = header_map.get('content-type', '').split(';', 1)[0].strip()
+        if mimetype not in self.mimetypes:
+            return False
+
+        length = header_map.get('content-length')
+        if length is not None and int(length) < self.min_size:
+            return False
+        return True
+
+    @staticmethod
+    def _weaken_etag(value):
+        # The compressed body is no longer byte-identical to the original,
+        # so a strong validator has to be downgraded to a weak one.
+        return value if value.startswith('W/') else 'W/' + value
+
+    def _compress(self, app_iter, encoding, streamed):
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=min(self.level, 11))
+            compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+            compress = compressor.compress
+            flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            finish = compressor.flush
+
+        for chunk in app_iter:
+            data = compress(chunk)
+            if streamed:
+                data += flush()
+            if data:
+                yield data
+        yield finish()
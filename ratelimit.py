@@ -0,0 +1,220 @@
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, g, request
+from flask_login import current_user
+from werkzeug.exceptions import ServiceUnavailable, TooManyRequests
+from werkzeug.wsgi import ClosingIterator
+
+
+class MemoryBackend:
+    """Token buckets held in this process. Each worker limits on its own.
+
+    At most ``max_keys`` buckets are kept; the least recently used one is
+    dropped first, since it is the most likely to have refilled anyway.
+    """
+
+    max_keys = 10000
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, rate, burst):
+        """Take one token from the bucket; return seconds to wait, 0 if allowed."""
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class SQLiteBackend:
+    """Token buckets in a local SQLite file shared by all workers on the host.
+
+    SQLite calls block the whole worker (gevent cannot switch during them),
+    so each process keeps one connection and waits at most ``busy_timeout``
+    seconds for the file lock. Any error lets the request through.
+    """
+
+    busy_timeout = 0.05
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        # A connection must not be shared with a forked child
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets '
+                         '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def consume(self, key, rate, burst):
+        """Take one token from the bucket; return seconds to wait, 0 if allowed."""
+        now = time.time()
+        with self._lock:
+            conn = None
+            try:
+                conn = self._connection()
+                conn.execute('BEGIN IMMEDIATE')
+                row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+                tokens, updated = row if row else (burst, now)
+                tokens = min(burst, tokens + (now - updated) * rate)
+                if tokens >= 1:
+                    tokens -= 1
+                    wait = 0
+                else:
+                    wait = (1 - tokens) / rate
+                conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                             (key, tokens, now))
+                if random.random() < 0.01:
+                    conn.execute('DELETE FROM buckets WHERE updated < ?', (now - 3600,))
+                conn.execute('COMMIT')
+            except (sqlite3.Error, OSError):
+                if conn is not None and conn.in_transaction:
+                    try:
+                        conn.execute('ROLLBACK')
+                    except sqlite3.Error:
+                        self._conn = None
+                # Never lock students out because the limiter store is unavailable
+                wait = 0
+        return wait
+
+
+class RateLimiter:
+    """Per user (or IP) and per endpoint token-bucket limits.
+
+    Limits are read from ``RATE_LIMITS`` as ``name: (tokens_per_second, burst)``.
+    The backend is created on first use so importing the app has no side effects.
+    """
+
+    def __init__(self, app=None):
+        self._backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['rate_limiter'] = self
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            if current_app.config['RATE_LIMIT_STORAGE'] == 'sqlite':
+                self._backend = SQLiteBackend(current_app.config['RATE_LIMIT_SQLITE_PATH'])
+            else:
+                self._backend = MemoryBackend()
+        return self._backend
+
+    def limit(self, name, methods=None, key=None):
+        """Limit a view. ``key`` returns the client identity; the default is the
+        logged-in user, or the client IP before login."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if (current_app.config['RATE_LIMIT_ENABLED']
+                        and (methods is None or request.method in methods)):
+                    rate, burst = current_app.config['RATE_LIMITS'][name]
+                    if key is not None:
+                        client = key()
+                    elif current_user.is_authenticated:
+                        client = 'user:' + current_user.get_id()
+                    else:
+                        client = 'ip:' + (request.remote_addr or 'unknown')
+                    wait = self.backend.consume(f'{name}:{client}', rate, burst)
+                    if wait:
+                        raise TooManyRequests(retry_after=math.ceil(wait))
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+class AdmissionController:
+    """Caps the requests in flight per worker and sheds low priority ones first.
+
+    Every request is counted from ``before_request`` until its response body
+    has been sent. Views marked ``high`` (exam submissions) are always
+    admitted, unmarked ones up to ``ADMISSION_MAX_IN_FLIGHT`` and ``low`` ones
+    (library downloads) only while the worker is below
+    ``ADMISSION_LOW_PRIORITY_SHARE`` of that.
+    """
+
+    def __init__(self, app=None):
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['admission'] = self
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def priority(self, level):
+        """Mark a view as ``high`` or ``low`` priority."""
+        def decorator(view):
+            view.admission_priority = level
+            return view
+        return decorator
+
+    def _before_request(self):
+        view = current_app.view_functions.get(request.endpoint)
+        level = getattr(view, 'admission_priority', 'normal')
+
+        max_in_flight = current_app.config['ADMISSION_MAX_IN_FLIGHT']
+        if level == 'low':
+            limit = max_in_flight * current_app.config['ADMISSION_LOW_PRIORITY_SHARE']
+        elif level == 'high':
+            limit = math.inf
+        else:
+            limit = max_in_flight
+
+        with self._lock:
+            if self.in_flight >= limit:
+                raise ServiceUnavailable(retry_after=current_app.config['ADMISSION_RETRY_AFTER'])
+            self.in_flight += 1
+        g.admitted = True
+
+    def _after_request(self, response):
+        if g.pop('admitted', False):
+            if response.direct_passthrough:
+                # send_file bypasses the response's own close callbacks
+                response.response = ClosingIterator(response.response, self._release)
+            else:
+                response.call_on_close(self._release)
+        return response
+
+    def _teardown_request(self, exc):
+        # after_request did not run, so nothing else will release the slot
+        if g.pop('admitted', False):
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+limiter = RateLimiter()
+admission = AdmissionController()
@@ -96,6 +96,18 @@ document.addEventListener('DOMContentLoaded', function() {
         }, 1000);
     }
 
+    // Saved exam answers must not outlive the session on a shared computer
+    const logoutLink = document.getElementById('logout-link');
+    if (logoutLink) {
+        logoutLink.addEventListener('click', clearExamStorage);
+    }
+
+    // Offline-capable exam delivery
+    const examForm = document.getElementById('exam-form');
+    if (examForm && examForm.dataset.questionsUrl) {
+        setupExamDelivery(examForm);
+    }
+
     // Markdown preview for descriptions
     const markdownPreviewToggles = document.querySelectorAll('.markdown-preview-toggle');
     markdownPreviewToggles.forEach(toggle => {
@@ -189,55 +201,251 @@ function downloadFileWithProgress(url, filename) {
     xhr.send();
 }
 
-// Auto-save exam answers
-function setupAutoSave(formId, saveInterval = 30000) {
-    const form = document.getElementById(formId);
-    if (!form) return;
-    
-    const saveData = () => {
-        const formData = new FormData(form);
-        const data = Object.fromEntries(formData);
-        
-        localStorage.setItem(`exam_${formId}_autosave`, JSON.stringify({
-            data: data,
-            timestamp: new Date().toISOString()
-        }));
-        
-        showNotification('Answers auto-saved', 'info');
+// Offline-capable exam delivery: questions come from a cacheable JSON endpoint,
+// answers are kept in localStorage and synced to the server in small batches.
+function setupExamDelivery(form, syncInterval = 15000) {
+    const container = document.getElementById('exam-questions');
+    const status = document.getElementById('exam-sync-status');
+    // Keyed by user as well, so a shared computer never mixes students' answers
+    const storageKey = `exam_${form.dataset.userId}_${form.dataset.examId}`;
+
+    let saved = {};
+    try {
+        saved = JSON.parse(localStorage.getItem(storageKey)) || {};
+    } catch (e) {
+        console.error('Failed to load saved exam state:', e);
+    }
+
+    const state = {
+        questions: saved.questions || null,
+        answers: saved.answers || {},
+        pending: saved.pending || {},
+        token: saved.token || generateClientToken()
     };
-    
-    // Save on interval
-    setInterval(saveData, saveInterval);
-    
-    // Save on visibility change
-    document.addEventListener('visibilitychange', () => {
-        if (document.hidden) {
-            saveData();
+    let syncing = false;
+    let submitting = false;
+    const submitBtn = form.querySelector('button[type="submit"]');
+    const submitLabel = submitBtn ? submitBtn.innerHTML : '';
+    // Nothing can be submitted until the questions and saved answers are shown
+    let ready = false;
+    if (submitBtn) {
+        submitBtn.disabled = true;
+    }
+
+    const persist = () => {
+        try {
+            localStorage.setItem(storageKey, JSON.stringify(state));
+        } catch (e) {
+            console.error('Failed to save exam state:', e);
         }
-    });
-    
-    // Check for saved data on load
-    const savedData = localStorage.getItem(`exam_${formId}_autosave`);
-    if (savedData) {
+    };
+
+    const setStatus = (text) => {
+        if (status) {
+            status.textContent = text;
+        }
+    };
+
+    const renderQuestions = () => {
+        container.innerHTML = '';
+        state.questions.forEach((question, index) => {
+            const name = `question_${index}`;
+            const card = document.createElement('div');
+            card.className = 'card mb-3';
+            const body = document.createElement('div');
+            body.className = 'card-body';
+            const title = document.createElement('h5');
+            title.className = 'card-title';
+            title.textContent = `Question ${index + 1}: ${question.question}`;
+            body.appendChild(title);
+
+            let choices = null;
+            if (question.question_type === 'multiple_choice') {
+                choices = question.options;
+            } else if (question.question_type === 'true_false') {
+                choices = ['True', 'False'];
+            }
+
+            if (choices) {
+                choices.forEach((choice, optionIndex) => {
+                    const wrapper = document.createElement('div');
+                    wrapper.className = 'form-check mb-2';
+                    const input = document.createElement('input');
+                    input.className = 'form-check-input';
+                    input.type = 'radio';
+                    input.name = name;
+                    input.id = `q${index}_option${optionIndex + 1}`;
+                    input.value = choice;
+                    input.checked = state.answers[name] === choice;
+                    const label = document.createElement('label');
+                    label.className = 'form-check-label';
+                    label.htmlFor = input.id;
+                    label.textContent = choice;
+                    wrapper.append(input, label);
+                    body.appendChild(wrapper);
+                });
+            } else {
+                const textarea = document.createElement('textarea');
+                textarea.className = 'form-control';
+                textarea.name = name;
+                textarea.rows = 3;
+                textarea.maxLength = parseInt(form.dataset.maxAnswerLength);
+                textarea.placeholder = 'Type your answer here...';
+                textarea.value = state.answers[name] || '';
+                body.appendChild(textarea);
+            }
+
+            card.appendChild(body);
+            container.appendChild(card);
+        });
+    };
+
+    const recordAnswer = (event) => {
+        const input = event.target;
+        if (!input.name || !input.name.startsWith('question_')) return;
+        state.answers[input.name] = input.value;
+        state.pending[input.name] = input.value;
+        persist();
+        setStatus('Answers saved on this device');
+    };
+
+    // Send only the answers changed since the last successful sync. keepalive
+    // caps the body at 64 KB, so it is only used for the flush on tab hide.
+    const sync = async (keepalive = false) => {
+        if (syncing || submitting || Object.keys(state.pending).length === 0) return;
+        syncing = true;
+        const batch = state.pending;
+        state.pending = {};
         try {
-            const { data, timestamp } = JSON.parse(savedData);
-            Object.keys(data).forEach(key => {
-                const input = form.querySelector(`[name="${key}"]`);
-                if (input) {
-                    if (input.type === 'radio' || input.type === 'checkbox') {
-                        if (input.value === data[key]) {
-                            input.checked = true;
-                        }
-                    } else {
-                        input.value = data[key];
+            const response = await fetch(form.dataset.autosaveUrl, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ answers: batch }),
+                keepalive: keepalive
+            });
+            if (!response.ok || response.redirected) throw new Error(`Autosave failed: ${response.status}`);
+            setStatus(`All answers saved at ${new Date().toLocaleTimeString()}`);
+        } catch (e) {
+            state.pending = Object.assign(batch, state.pending);
+            setStatus('Answers saved on this device, will sync when back online');
+        } finally {
+            persist();
+            syncing = false;
+        }
+    };
+
+    const submit = async (event) => {
+        event.preventDefault();
+        if (submitting || !ready) return;
+        submitting = true;
+        setStatus('Submitting...');
+
+        // The token makes retries safe: the server records one submission only
+        while (true) {
+            let retryAfter = 5;
+            try {
+                const response = await fetch(form.dataset.submitUrl, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ token: state.token, answers: state.answers })
+                });
+                const data = await response.json().catch(() => ({}));
+                if (response.ok && data.success) {
+                    localStorage.removeItem(storageKey);
+                    window.location.href = data.redirect;
+                    return;
+                }
+                if (response.redirected) {
+                    // Session expired: answers stay in localStorage, and reloading
+                    // the exam page sends the student to log in and back here
+                    window.location.href = form.action;
+                    return;
+                }
+                if (response.status === 409) {
+                    // The server has a submission, so the local copy is no longer needed
+                    localStorage.removeItem(storageKey);
+                    window.location.href = form.dataset.assignmentsUrl;
+                    return;
+                }
+                if (response.status < 500 && response.status !== 429) {
+                    showNotification(data.error || 'This exam cannot be submitted', 'error');
+                    setStatus('Your answers are still saved on this device.');
+                    if (submitBtn) {
+                        submitBtn.disabled = false;
+                        submitBtn.innerHTML = submitLabel;
                     }
+                    submitting = false;
+                    return;
                 }
-            });
-            
-            const time = new Date(timestamp).toLocaleTimeString();
-            showNotification(`Loaded auto-saved answers from ${time}`, 'warning');
+                retryAfter = parseInt(response.headers.get('Retry-After')) || retryAfter;
+            } catch (e) {
+                console.error('Exam submit failed:', e);
+            }
+            setStatus(`Connection problem, retrying in ${retryAfter}s. Your answers are safe on this device.`);
+            await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+        }
+    };
+
+    const start = async () => {
+        try {
+            // The browser revalidates with the ETag, so unchanged questions cost a 304
+            const response = await fetch(form.dataset.questionsUrl);
+            if (!response.ok || response.redirected) throw new Error(`Loading questions failed: ${response.status}`);
+            state.questions = (await response.json()).questions;
+            persist();
+        } catch (e) {
+            if (!state.questions) {
+                container.innerHTML = '<div class="alert alert-danger">Could not load the exam. Check your connection and refresh the page.</div>';
+                return;
+            }
+            showNotification('You are offline, using the saved copy of this exam', 'warning');
+        }
+
+        try {
+            // Answers synced from another device fill in anything not saved here
+            const response = await fetch(form.dataset.autosaveUrl);
+            if (response.ok && !response.redirected) {
+                state.answers = Object.assign((await response.json()).answers, state.answers);
+                persist();
+            }
         } catch (e) {
-            console.error('Failed to load auto-saved data:', e);
+            console.error('Failed to load synced answers:', e);
+        }
+
+        renderQuestions();
+        ready = true;
+        if (submitBtn) {
+            submitBtn.disabled = false;
         }
+        form.addEventListener('change', recordAnswer);
+        form.addEventListener('input', recordAnswer);
+        setInterval(() => sync(), syncInterval);
+        window.addEventListener('online', () => sync());
+        document.addEventListener('visibilitychange', () => {
+            if (document.hidden) {
+                sync(true);
+            }
+        });
+    };
+
+    // Registered before any await so the browser never falls back to a native POST
+    form.addEventListener('submit', submit);
+    start();
+}
+
+function clearExamStorage() {
+    try {
+        Object.keys(localStorage)
+            .filter(key => key.startsWith('exam_'))
+            .forEach(key => localStorage.removeItem(key));
+    } catch (e) {
+        console.error('Failed to clear saved exam state:', e);
+    }
+}
+
+function generateClientToken() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
     }
+    return `${Date.now()}-${Math.random().toString(36).slice(2)}`;
 }